@@ -1,12 +1,42 @@
 import sys
 import os
-from urllib.parse import urlparse, urljoin
-from playwright.sync_api import sync_playwright
-from typing import List, Dict, Tuple
+import asyncio
+import json
+from collections import OrderedDict
+from urllib.parse import urlparse, urljoin, urldefrag
+from playwright.async_api import async_playwright
+from typing import List, Dict, NamedTuple, Set, Tuple
 import re
 import yaml
 from pathlib import Path
 
+# Prefer the LibYAML-backed loader when PyYAML was built with it; it parses
+# several times faster than the pure-Python SafeLoader.
+try:
+    from yaml import CSafeLoader as _YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlSafeLoader
+
+# Parsed-config cache: absolute path -> (mtime, size, config). Entries are
+# revalidated against the file's current mtime and size, so edits to
+# config.yaml are picked up on the next load.
+_CONFIG_CACHE: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+_CONFIG_CACHE_MAX_ENTRIES = 100
+
+# Compiled once; calculate_link_score tokenizes twice per link
+_WORD_RE = re.compile(r'\w+')
+
+# Resource types that never affect the saved HTML; blocking them cuts most
+# of the bytes transferred per page.
+_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+async def _block_heavy_resources(route):
+    """Route handler that aborts image/media/font requests."""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 def is_safe_path(base_dir: str, path: str) -> bool:
     """
     Check if the path is safe (no directory traversal, relative to base_dir).
@@ -16,9 +46,12 @@ def is_safe_path(base_dir: str, path: str) -> bool:
         # Convert to absolute path and resolve any symlinks/relative components
         base_path = os.path.abspath(base_dir)
         full_path = os.path.abspath(os.path.join(base_dir, path))
-        
-        # Check if the resolved path is under the base directory
-        return os.path.commonpath([base_path, full_path]) == base_path
+
+        # Check if the resolved path is under the base directory. A plain
+        # prefix check (with a trailing separator, so "/base2" doesn't pass
+        # for "/base") is cheaper than os.path.commonpath, which splits and
+        # walks both paths component by component.
+        return full_path == base_path or full_path.startswith(base_path + os.sep)
     except Exception:
         return False
 
@@ -51,15 +84,60 @@ def load_config(config_path: str = "config.yaml") -> Dict:
             "large_font_threshold": 16
         }
     }
-    
+
     # Sanitize config path
     current_dir = os.getcwd()
     safe_config_path = sanitize_path(current_dir, config_path, "config.yaml")
-    
+
     try:
-        with open(safe_config_path, 'r') as f:
-            config = yaml.safe_load(f)
-        return config if config else default_config
+        cache_key = os.path.abspath(safe_config_path)
+        stat = os.stat(safe_config_path)
+
+        # Reuse the parsed config if the file hasn't changed since last load
+        cached = _CONFIG_CACHE.get(cache_key)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            _CONFIG_CACHE.move_to_end(cache_key)
+            return cached[2]
+
+        # A JSON sidecar (config.yaml.json) caches the parsed config on
+        # disk; json.loads is much faster than YAML parsing, so later runs
+        # skip PyYAML entirely as long as the sidecar isn't older than the
+        # YAML file.
+        sidecar_path = safe_config_path + ".json"
+        config = None
+        try:
+            if os.stat(sidecar_path).st_mtime >= stat.st_mtime:
+                with open(sidecar_path, 'r') as f:
+                    config = json.load(f)
+        except (OSError, ValueError):
+            config = None  # Missing or stale/corrupt sidecar; reparse the YAML
+
+        if config is None:
+            with open(safe_config_path, 'r') as f:
+                config = yaml.load(f, Loader=_YamlSafeLoader)
+            if not config:
+                return default_config
+            # Refresh the sidecar atomically; best effort only. YAML can
+            # produce values JSON can't represent (dates raise TypeError)
+            # or coerces silently (non-string keys become strings), so the
+            # sidecar is only written when the round trip is lossless.
+            try:
+                dumped = json.dumps(config)
+                if json.loads(dumped) == config:
+                    tmp_path = sidecar_path + ".tmp"
+                    with open(tmp_path, 'w') as f:
+                        f.write(dumped)
+                    os.replace(tmp_path, sidecar_path)
+            except (OSError, TypeError, ValueError):
+                pass
+        if not config:
+            return default_config
+
+        _CONFIG_CACHE[cache_key] = (stat.st_mtime, stat.st_size, config)
+        _CONFIG_CACHE.move_to_end(cache_key)
+        while len(_CONFIG_CACHE) > _CONFIG_CACHE_MAX_ENTRIES:
+            _CONFIG_CACHE.popitem(last=False)
+        return config
     except (FileNotFoundError, yaml.YAMLError) as e:
         print(f"Warning: Could not load config file ({str(e)}). Using default configuration.")
         return default_config
@@ -69,163 +147,344 @@ def get_base_domain(url: str) -> str:
     parsed = urlparse(url)
     return parsed.netloc
 
-def calculate_link_score(page, link_element, base_url: str, page_title: str, config: Dict) -> float:
+# Extracts every feature the scoring heuristics need for all links in a
+# single evaluate call, instead of one browser round trip per property
+# per link.
+_LINK_FEATURES_JS = """() => Array.from(document.querySelectorAll('a[href]')).map(link => {
+    const style = window.getComputedStyle(link);
+    const rect = link.getBoundingClientRect();
+    const parents = [];
+    let current = link;
+    while (current && current.tagName && parents.length < 3) {
+        parents.push(current.tagName.toLowerCase());
+        current = current.parentElement;
+    }
+    return {
+        href: link.getAttribute('href'),
+        text: link.textContent || '',
+        parents: parents,
+        y: rect.top,
+        fontSize: parseFloat(style.fontSize),
+        isVisible: style.display !== 'none' && style.visibility !== 'hidden',
+        isBold: (parseInt(style.fontWeight) || 400) >= 600
+    };
+})"""
+
+# Installed once per context via add_init_script so every page already has
+# the extractor compiled; per-page scoring then only ships a short call.
+_INSTALL_RANK_LINKS_JS = "window.__rankLinks = " + _LINK_FEATURES_JS + ";"
+
+class ScoringContext(NamedTuple):
+    """Loop-invariant inputs to calculate_link_score, built once per page."""
+    base_url: str
+    base_domain: str
+    title_words: Set[str]
+    viewport_height: int
+    internal_link_bonus: float
+    title_word_match_weight: float
+    vertical_position_weight: float
+    content_indicators: Set[str]
+    navigation_indicators: Set[str]
+    content_area_bonus: float
+    navigation_area_penalty: float
+    visible_link_bonus: float
+    bold_text_bonus: float
+    large_font_bonus: float
+    large_font_threshold: float
+
+def build_scoring_context(base_url: str, page_title: str, viewport_height: int, config: Dict) -> ScoringContext:
+    """Precompute everything scoring needs that doesn't vary per link."""
+    return ScoringContext(
+        base_url=base_url,
+        base_domain=get_base_domain(base_url),
+        title_words=set(_WORD_RE.findall(page_title.lower())),
+        viewport_height=viewport_height,
+        internal_link_bonus=config["domain"]["internal_link_bonus"],
+        title_word_match_weight=config["content"]["title_word_match_weight"],
+        vertical_position_weight=config["position"]["vertical_position_weight"],
+        content_indicators=set(config["context"]["content_indicators"]),
+        navigation_indicators=set(config["context"]["navigation_indicators"]),
+        content_area_bonus=config["context"]["content_area_bonus"],
+        navigation_area_penalty=config["context"]["navigation_area_penalty"],
+        visible_link_bonus=config["prominence"]["visible_link_bonus"],
+        bold_text_bonus=config["prominence"]["bold_text_bonus"],
+        large_font_bonus=config["prominence"]["large_font_bonus"],
+        large_font_threshold=config["prominence"]["large_font_threshold"],
+    )
+
+def calculate_link_score(features: Dict, ctx: ScoringContext) -> float:
     """Calculate a relevance score for a link based on various heuristics."""
     score = 0.0
-    
-    # Get link properties
-    href = link_element.get_attribute('href')
+
+    href = features['href']
     if not href:
         return -1.0  # Invalid link
-    
-    absolute_url = urljoin(base_url, href)
-    link_text = link_element.text_content() or ''
-    
+
+    absolute_url = urljoin(ctx.base_url, href)
+
     # 1. Domain relevance (internal links get a boost)
-    if get_base_domain(absolute_url) == get_base_domain(base_url):
-        score += config["domain"]["internal_link_bonus"]
-    
+    if get_base_domain(absolute_url) == ctx.base_domain:
+        score += ctx.internal_link_bonus
+
     # 2. Text relevance to page title
-    title_words = set(re.findall(r'\w+', page_title.lower()))
-    link_words = set(re.findall(r'\w+', link_text.lower()))
-    word_overlap = len(title_words.intersection(link_words))
-    score += word_overlap * config["content"]["title_word_match_weight"]
-    
-    # 3. Position in document (higher = better)
-    bounding_box = link_element.bounding_box()
-    if bounding_box:
+    link_words = set(_WORD_RE.findall(features['text'].lower()))
+    word_overlap = len(ctx.title_words.intersection(link_words))
+    score += word_overlap * ctx.title_word_match_weight
+
+    # 3. Position in document (higher = better). Hidden elements report a
+    # zero rect, which would read as top-of-page, so only visible links get
+    # a position score (bounding_box() likewise returned null for them).
+    if features['isVisible']:
         # Normalize position (0 to 1, where 0 is top of page)
-        viewport_height = page.viewport_size['height']
-        position_score = 1.0 - (min(bounding_box['y'], viewport_height) / viewport_height)
-        score += position_score * config["position"]["vertical_position_weight"]
-    
+        position_score = 1.0 - (min(features['y'], ctx.viewport_height) / ctx.viewport_height)
+        score += position_score * ctx.vertical_position_weight
+
     # 4. Main content area detection
-    parent_tags = page.evaluate("""(element) => {
-        const parents = [];
-        let current = element;
-        while (current && current.tagName) {
-            parents.push(current.tagName.toLowerCase());
-            current = current.parentElement;
-        }
-        return parents;
-    }""", link_element)
-    
-    content_indicators = set(config["context"]["content_indicators"])
-    navigation_indicators = set(config["context"]["navigation_indicators"])
-    
-    if any(tag in content_indicators for tag in parent_tags[:3]):
-        score += config["context"]["content_area_bonus"]
-    if any(tag in navigation_indicators for tag in parent_tags[:3]):
-        score += config["context"]["navigation_area_penalty"]
-    
+    parent_tags = features['parents']
+
+    if any(tag in ctx.content_indicators for tag in parent_tags[:3]):
+        score += ctx.content_area_bonus
+    if any(tag in ctx.navigation_indicators for tag in parent_tags[:3]):
+        score += ctx.navigation_area_penalty
+
     # 5. Link prominence
-    styles = page.evaluate("""(element) => {
-        const style = window.getComputedStyle(element);
-        return {
-            fontSize: parseFloat(style.fontSize),
-            isVisible: style.display !== 'none' && style.visibility !== 'hidden',
-            isBold: style.fontWeight >= 600
-        };
-    }""", link_element)
-    
-    if styles.get('isVisible', False):
-        score += config["prominence"]["visible_link_bonus"]
-        if styles.get('isBold', False):
-            score += config["prominence"]["bold_text_bonus"]
-        font_size = styles.get('fontSize', 0)
-        if font_size > config["prominence"]["large_font_threshold"]:
-            score += config["prominence"]["large_font_bonus"]
-    
+    if features['isVisible']:
+        score += ctx.visible_link_bonus
+        if features['isBold']:
+            score += ctx.bold_text_bonus
+        if features['fontSize'] > ctx.large_font_threshold:
+            score += ctx.large_font_bonus
+
     return max(0.0, score)  # Ensure non-negative score
 
-def get_ranked_links(page, base_url: str, config: Dict) -> List[Tuple[str, float]]:
+async def get_ranked_links(page, base_url: str, config: Dict) -> List[Tuple[str, float]]:
     """Get all links on the page with their relevance scores."""
     # Get page title for relevance comparison
-    page_title = page.title()
-    
-    # Get all links and calculate their scores
-    links = page.query_selector_all('a[href]')
-    ranked_links = []
-    
-    for link in links:
-        href = link.get_attribute('href')
+    page_title = await page.title()
+    ctx = build_scoring_context(base_url, page_title, page.viewport_size['height'], config)
+
+    # Collect the features of every link in one round trip, then score in
+    # Python. Pages from crawl_and_save's context have the extractor
+    # preinstalled as window.__rankLinks; the inline source is only the
+    # fallback for pages without the init script.
+    link_features = await page.evaluate(
+        "() => (window.__rankLinks || (" + _LINK_FEATURES_JS + "))()")
+
+    # Several anchors often point at the same page (nav links, #fragment
+    # variants); keep one entry per defragmented URL with its best score so
+    # the crawl never fetches a page twice.
+    best_scores: Dict[str, float] = {}
+    for features in link_features:
+        href = features['href']
         if href:
-            absolute_url = urljoin(base_url, href)
-            score = calculate_link_score(page, link, base_url, page_title, config)
-            if score > 0:  # Only include valid links
-                ranked_links.append((absolute_url, score))
-    
+            absolute_url = urldefrag(urljoin(base_url, href))[0]
+            score = calculate_link_score(features, ctx)
+            if score > 0 and score > best_scores.get(absolute_url, 0.0):  # Only include valid links
+                best_scores[absolute_url] = score
+
     # Sort by score in descending order
-    ranked_links.sort(key=lambda x: x[1], reverse=True)
+    ranked_links = sorted(best_scores.items(), key=lambda x: x[1], reverse=True)
     return ranked_links
 
-def save_page(page, url: str, filename: str) -> bool:
-    """Saves the rendered HTML content of a page."""
-    try:
-        # Ensure the directory exists and is safe
-        output_dir = os.path.dirname(filename)
-        if output_dir and not is_safe_path(os.getcwd(), output_dir):
-            print(f"Error: Unsafe output path '{filename}'")
-            return False
-            
-        # Create directory if it doesn't exist
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            
-        page.goto(url, wait_until="networkidle")
+def _write_file(filename: str, content) -> bool:
+    """Writes content to an already-validated location."""
+    # Raw response bodies arrive as bytes and are written without a decode
+    # round trip; rendered content arrives as str.
+    if isinstance(content, bytes):
+        with open(filename, "wb") as f:
+            f.write(content)
+    else:
         with open(filename, "w", encoding="utf-8") as f:
-            f.write(page.content())
-        return True
+            f.write(content)
+    return True
+
+def write_html(filename: str, content) -> bool:
+    """Writes HTML content to a file, creating the output directory if needed."""
+    # Ensure the directory exists and is safe
+    output_dir = os.path.dirname(filename)
+    if output_dir and not is_safe_path(os.getcwd(), output_dir):
+        print(f"Error: Unsafe output path '{filename}'")
+        return False
+
+    # Create directory if it doesn't exist
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    return _write_file(filename, content)
+
+async def goto_and_settle(page, url: str, wait_until: str = "domcontentloaded"):
+    """
+    Navigate to a URL without waiting for the network to go fully idle.
+
+    "networkidle" stalls for pages with analytics beacons or long-polling;
+    "domcontentloaded" is enough for mirroring, with a bounded best-effort
+    wait for the full load event on top.
+    """
+    await page.goto(url, wait_until=wait_until, timeout=15000)
+    if wait_until == "domcontentloaded":
+        try:
+            await page.wait_for_load_state("load", timeout=5000)
+        except Exception:
+            pass  # Page is usable even if some subresources never finish
+
+async def write_html_async(filename: str, content, prevalidated_dir: bool = False) -> bool:
+    """
+    Runs write_html in a worker thread so the event loop keeps fetching.
+
+    Pass prevalidated_dir=True when the output directory was already
+    safety-checked and created; this skips the per-write path check and
+    makedirs stat.
+    """
+    writer = _write_file if prevalidated_dir else write_html
+    try:
+        return await asyncio.to_thread(writer, filename, content)
+    except Exception as e:
+        print(f"Error writing {filename}: {str(e)}")
+        return False
+
+async def fetch_page(page, url: str, wait_until: str = "domcontentloaded"):
+    """Navigates to a page and returns its rendered HTML, or None on error."""
+    try:
+        await goto_and_settle(page, url, wait_until)
+        return await page.content()
+    except Exception as e:
+        print(f"Error saving {url}: {str(e)}")
+        return None
+
+async def fetch_page_raw(page, url: str):
+    """
+    Fetches a page over plain HTTP, skipping rendering entirely.
+
+    Returns the response body as bytes, or None on error. Suitable for
+    pages that don't need JavaScript execution: no Chromium render, and
+    the bytes are written to disk without a decode round trip.
+    """
+    try:
+        response = await page.request.get(url, timeout=15000)
+        if not response.ok:
+            print(f"Error saving {url}: HTTP {response.status}")
+            return None
+        return await response.body()
     except Exception as e:
         print(f"Error saving {url}: {str(e)}")
+        return None
+
+async def save_page(page, url: str, filename: str, wait_until: str = "domcontentloaded") -> bool:
+    """Navigates to a page and saves its rendered HTML content."""
+    content = await fetch_page(page, url, wait_until)
+    if content is None:
         return False
+    return await write_html_async(filename, content)
+
+async def crawl_and_save(base_url: str, max_pages: int, output_dir: str = "site_mirror", config_path: str = "config.yaml", concurrency: int = 4, wait_until: str = "domcontentloaded", render_subpages: bool = True):
+    """
+    Crawls and saves multiple pages, fetching sub-pages concurrently.
 
-def crawl_and_save(base_url: str, max_pages: int, output_dir: str = "site_mirror", config_path: str = "config.yaml"):
-    """Crawls and saves multiple pages."""
+    With render_subpages=False, sub-pages are downloaded over plain HTTP
+    instead of rendered in Chromium - much faster and lighter, but any
+    content injected by JavaScript will be missing from the mirror. The
+    landing page is always rendered, since link ranking needs its DOM.
+    """
     # Sanitize output directory path
     current_dir = os.getcwd()
     safe_output_dir = sanitize_path(current_dir, output_dir, "site_mirror")
-    
+
     try:
         os.makedirs(safe_output_dir, exist_ok=True)
     except Exception as e:
         print(f"Error creating output directory: {str(e)}")
         return
-    
-    # Load ranking configuration
-    config = load_config(config_path)
-    print("Loaded ranking configuration from:", config_path if os.path.exists(config_path) else "default configuration")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        
-        # Set a reasonable viewport size
-        page.set_viewport_size({"width": 1280, "height": 800})
-        
-        # Save the main page
-        if not save_page(page, base_url, os.path.join(safe_output_dir, "index.html")):
+
+    async with async_playwright() as p:
+        # A persistent context keeps Chromium's HTTP disk cache and cookies
+        # in a profile directory under the mirror, so subresources shared
+        # across pages (and across runs) are served from cache. Launching
+        # Chromium dominates startup, so kick it off first and load the
+        # ranking configuration while it starts.
+        launch_task = asyncio.create_task(p.chromium.launch_persistent_context(
+            user_data_dir=os.path.join(safe_output_dir, ".pw_profile"),
+            viewport={"width": 1280, "height": 800},
+        ))
+
+        config = await asyncio.to_thread(load_config, config_path)
+        print("Loaded ranking configuration from:", config_path if os.path.exists(config_path) else "default configuration")
+
+        context = await launch_task
+        # Only the HTML is saved, so skip downloading images, video and
+        # fonts entirely. Registered on the context so every page (including
+        # the worker pages) inherits the filter.
+        await context.route("**/*", _block_heavy_resources)
+        # Compile the link-feature extractor once for the whole context so
+        # every page has window.__rankLinks ready before scripts run.
+        await context.add_init_script(script=_INSTALL_RANK_LINKS_JS)
+        page = await context.new_page()
+
+        # Navigate to the main page once: the same loaded DOM is used both to
+        # save index.html and to extract links, so the landing page is only
+        # fetched a single time.
+        try:
+            await goto_and_settle(page, base_url, wait_until)
+        except Exception as e:
+            print(f"Error saving {base_url}: {str(e)}")
             print("Failed to save main page. Exiting.")
-            browser.close()
+            await context.close()
             return
-        
-        # Get ranked links from the main page
-        ranked_links = get_ranked_links(page, base_url, config)
+        if not await write_html_async(os.path.join(safe_output_dir, "index.html"), await page.content(), prevalidated_dir=True):
+            print("Failed to save main page. Exiting.")
+            await context.close()
+            return
+
+        # Get ranked links from the already-loaded main page
+        ranked_links = await get_ranked_links(page, base_url, config)
         print(f"\nFound {len(ranked_links)} links, ranked by relevance:")
         for i, (url, score) in enumerate(ranked_links[:5], 1):
             print(f"{i}. Score {score:.2f}: {url}")
-        
-        # Crawl the highest-ranked pages up to max_pages
+
+        # Crawl the highest-ranked pages concurrently up to max_pages.
+        # Each worker owns its own Page so navigations overlap on network I/O.
         pages_saved = 1  # Count main page
+        seen = {urldefrag(base_url)[0]}  # Main page is already saved as index.html
+        queue: asyncio.Queue = asyncio.Queue()
         for i, (url, score) in enumerate(ranked_links):
-            if pages_saved >= max_pages:
-                break
-                
-            print(f"\nCrawling {url} (relevance score: {score:.2f})")
-            if save_page(page, url, os.path.join(safe_output_dir, f"page_{i}.html")):
+            if url in seen:
+                continue
+            seen.add(url)
+            queue.put_nowait((i, url, score))
+
+        # Disk writes run as background tasks so a worker's page can start
+        # its next navigation while the previous HTML is still being written.
+        write_tasks = []
+
+        async def worker(worker_page):
+            nonlocal pages_saved
+            while not queue.empty():
+                if pages_saved >= max_pages:
+                    break
+                i, url, score = queue.get_nowait()
+                # Reserve the budget slot before awaiting the fetch;
+                # otherwise every in-flight worker passes the check above for
+                # the last slot and the crawl overshoots max_pages.
                 pages_saved += 1
-        
-        browser.close()
+                print(f"\nCrawling {url} (relevance score: {score:.2f})")
+                if render_subpages:
+                    content = await fetch_page(worker_page, url, wait_until)
+                else:
+                    content = await fetch_page_raw(worker_page, url)
+                if content is None:
+                    pages_saved -= 1  # Release the slot for the next link
+                    continue
+                filename = os.path.join(safe_output_dir, f"page_{i}.html")
+                write_tasks.append(asyncio.create_task(write_html_async(filename, content, prevalidated_dir=True)))
+
+        worker_pages = [await context.new_page() for _ in range(concurrency)]
+        await asyncio.gather(*[worker(worker_page) for worker_page in worker_pages])
+        if write_tasks:
+            # Pages whose background write failed were counted optimistically
+            # for the fetch budget; drop them from the final tally.
+            write_results = await asyncio.gather(*write_tasks)
+            pages_saved -= write_results.count(False)
+
+        await context.close()
         print(f"\nFinished crawling. Saved {pages_saved} pages.")
 
 if __name__ == "__main__":
@@ -247,5 +506,4 @@ if __name__ == "__main__":
         print(f"Error: {str(e)}")
         sys.exit(1)
 
-    crawl_and_save(base_url, max_pages, output_dir, config_path)
-
+    asyncio.run(crawl_and_save(base_url, max_pages, output_dir, config_path))